@@ -5,10 +5,14 @@
 Flask web application for the OriginalAkinator game.
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g, Response
+import atexit
+import functools
+import hmac
 import os
 import sys
 import json
+import time
 from werkzeug.utils import secure_filename
 
 # Add the src directory to the path
@@ -17,6 +21,7 @@ if src_dir not in sys.path:
     sys.path.append(src_dir)
 
 from src.akinator import Akinator, AkinatorNode
+from src import metrics
 
 app = Flask(__name__, static_folder='static')
 app.secret_key = "akinator_secret_key"  # 本番環境では安全な秘密鍵を使用してください
@@ -24,9 +29,37 @@ app.secret_key = "akinator_secret_key"  # 本番環境では安全な秘密鍵
 # 静的ファイルの設定
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # 開発中はキャッシュを無効化
 
+# バージョン管理APIの管理者トークン（未設定の場合はAPIを無効化）
+app.config['ADMIN_TOKEN'] = os.environ.get('AKINATOR_ADMIN_TOKEN')
+
 # AkinatorインスタンスをFlaskアプリのグローバル変数として保持する
 akinator = Akinator()
 
+# 負荷試験用のサンプリングプロファイラ（AKINATOR_PROFILE=1 で有効化）
+if os.environ.get('AKINATOR_PROFILE'):
+    profiler = metrics.SamplingProfiler()
+    profiler.start()
+
+    @atexit.register
+    def dump_profile():
+        """サンプリングを止めてから結果を表示する"""
+        profiler.stop()
+        profiler.dump()
+
+
+@app.before_request
+def start_timer():
+    """リクエストの処理開始時刻を記録する"""
+    g.request_start = time.perf_counter()
+
+
+@app.teardown_request
+def record_latency(exception=None):
+    """リクエストの処理時間を記録する（エラーになったリクエストも含む）"""
+    start = g.pop('request_start', None)
+    if start is not None and request.endpoint and request.endpoint != 'metrics_endpoint':
+        metrics.REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint=request.endpoint)
+
 
 @app.route('/')
 def index():
@@ -88,7 +121,12 @@ def learn():
     distinguishing_question = data.get('distinguishing_question')
     answer_for_correct = data.get('answer_for_correct') == 'yes'
     
-    akinator.learn(correct_answer, distinguishing_question, answer_for_correct)
+    if not akinator.learn(correct_answer, distinguishing_question, answer_for_correct):
+        # ゲーム中に知識ツリーが変更され、推測した項目が見つからなくなった
+        return jsonify({
+            'success': False,
+            'error': 'ゲーム中に知識ツリーが変更されたため、学習できませんでした。もう一度遊んでください。'
+        }), 409
     
     return jsonify({'success': True})
 
@@ -136,5 +174,63 @@ def add_character():
     return redirect(url_for('admin'))
 
 
+def admin_token_required(view):
+    """X-Admin-Token ヘッダーで管理者トークンを要求するデコレータ"""
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        token = app.config.get('ADMIN_TOKEN')
+        if not token:
+            return jsonify({'error': '管理者トークンが設定されていません'}), 403
+
+        given = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(given.encode('utf-8'), token.encode('utf-8')):
+            return jsonify({'error': '管理者トークンが正しくありません'}), 401
+
+        return view(*args, **kwargs)
+    return wrapped
+
+
+@app.route('/admin/versions')
+@admin_token_required
+def list_versions():
+    """知識ツリーのバージョン一覧を返す"""
+    return jsonify({'versions': akinator.list_versions()})
+
+
+@app.route('/admin/versions/diff')
+@admin_token_required
+def diff_versions():
+    """2つのバージョンの差分を返す"""
+    old_id = request.args.get('from', type=int)
+    new_id = request.args.get('to', type=int)
+    if old_id is None or new_id is None:
+        return jsonify({'error': 'from と to を指定してください'}), 400
+
+    try:
+        changes = akinator.diff_versions(old_id, new_id)
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+
+    return jsonify({'from': old_id, 'to': new_id, 'changes': changes})
+
+
+@app.route('/admin/versions/<int:version_id>/rollback', methods=['POST'])
+@admin_token_required
+def rollback_version(version_id):
+    """指定したバージョンに知識ツリーを戻す"""
+    try:
+        version = akinator.rollback(version_id)
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+
+    return jsonify({'success': True, 'version': version.to_dict()})
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus形式のメトリクスを返す"""
+    return Response(metrics.render_metrics(), content_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == '__main__':
     app.run(debug=True)
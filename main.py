@@ -21,12 +21,19 @@ def main():
     # Parse command line arguments
     parser = argparse.ArgumentParser(description="Run the OriginalAkinator game")
     parser.add_argument("--cli", action="store_true", help="Run in command line interface mode")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="Replay JSONL answer sequences from FILE ('-' for stdin) without a GUI")
+    parser.add_argument("--data", metavar="FILE", help="Path to the knowledge tree JSON file")
     args = parser.parse_args()
 
-    if args.cli:
-        # Run in CLI mode
-        from src.akinator import play_game
-        play_game()
+    if args.replay:
+        # Replay answer sequences headlessly
+        from src.akinator_cli import run_replay
+        sys.exit(run_replay(args.replay, args.data))
+    elif args.cli:
+        # Run in CLI mode (only the core engine is imported)
+        from src.akinator_cli import play_game
+        play_game(args.data)
     else:
         # Run in GUI mode
         try:
@@ -36,8 +43,8 @@ def main():
         except ImportError as e:
             print(f"Error importing tkinter: {e}")
             print("Falling back to CLI mode...")
-            from src.akinator import play_game
-            play_game()
+            from src.akinator_cli import play_game
+            play_game(args.data)
 
 
 if __name__ == "__main__":
@@ -9,8 +9,26 @@ by asking yes/no questions based on a decision tree.
 import json
 import os
 import random
+import stat
+import tempfile
+import threading
 from typing import Dict, List, Optional, Tuple, Union
 
+try:
+    from . import metrics
+    from .history import TreeHistory, TreeVersion
+except ImportError:
+    import metrics
+    from history import TreeHistory, TreeVersion
+
+
+# Default location of the knowledge tree
+DEFAULT_DATA_FILE = os.path.join("data", "knowledge_tree.json")
+
+# The process umask, read once at import because os.umask() can only be read by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
 
 class AkinatorNode:
     """A node in the Akinator decision tree."""
@@ -43,6 +61,13 @@ class AkinatorNode:
             
         return result
     
+    def copy(self) -> 'AkinatorNode':
+        """Create a shallow copy of the node that shares its children."""
+        node = AkinatorNode(self.content, self.is_question)
+        node.yes_node = self.yes_node
+        node.no_node = self.no_node
+        return node
+    
     @classmethod
     def from_dict(cls, data: Dict) -> 'AkinatorNode':
         """Create a node from a dictionary (deserialization)."""
@@ -60,23 +85,38 @@ class AkinatorNode:
 class Akinator:
     """The main Akinator game class."""
     
-    def __init__(self, data_file: str = None):
+    def __init__(self, data_file: str = None, max_versions: int = 100,
+                 root_node: Optional[AkinatorNode] = None):
         """
         Initialize the Akinator game.
         
         Args:
             data_file: Path to a JSON file containing the decision tree data
+            max_versions: Maximum number of tree versions kept for rollback
+            root_node: An already loaded tree; if given, the data file is neither read nor created
         """
         self.current_node = None
         self.root_node = None
-        self.data_file = data_file or os.path.join("data", "knowledge_tree.json")
+        # Nodes visited in the current game as (node, answer) pairs
+        self.path = []
+        self.data_file = data_file or DEFAULT_DATA_FILE
+        self.history = TreeHistory(max_versions)
+        # Serializes changes: each one reads the root, builds a new one and records it
+        self._lock = threading.Lock()
+        # Cached size of the tree, kept up to date incrementally for the gauges
+        self.tree_stats = {"nodes": 0, "leaves": 0, "depth": 0}
         
         # Try to load the decision tree
-        if os.path.exists(self.data_file):
+        if root_node is not None:
+            self.root_node = root_node
+            self.update_tree_metrics()
+        elif os.path.exists(self.data_file):
             self.load_tree()
         else:
             # Create a simple default tree if no data file exists
             self.create_default_tree()
+        
+        self.history.commit(self.root_node, "初期状態", self.tree_stats)
     
     def create_default_tree(self):
         """Create a simple default decision tree with a few examples."""
@@ -139,15 +179,19 @@ class Akinator:
         object_node.yes_node = chair
         object_node.no_node = table
         
+        self.update_tree_metrics()
+        
         # Save the tree
         self.save_tree()
     
     def load_tree(self):
         """Load the decision tree from a JSON file."""
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.root_node = AkinatorNode.from_dict(data)
+            with metrics.TREE_OPERATION_LATENCY.time(operation="load"):
+                with open(self.data_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    self.root_node = AkinatorNode.from_dict(data)
+            self.update_tree_metrics()
         except Exception as e:
             print(f"Error loading knowledge tree: {e}")
             self.create_default_tree()
@@ -157,30 +201,121 @@ class Akinator:
         if not self.root_node:
             return
         
-        # Create the data directory if it doesn't exist
-        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-        
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.root_node.to_dict(), f, indent=2, ensure_ascii=False)
+            self.write_tree_data(self.root_node.to_dict())
         except Exception as e:
             print(f"Error saving knowledge tree: {e}")
     
+    def write_tree_data(self, data: Dict):
+        """
+        Write already serialized tree data to the JSON file.
+        
+        Unlike save_tree(), this does not touch the live tree, so it can be called
+        from a background thread with a snapshot taken by to_dict(). The data is
+        written to a temporary file that then replaces the data file, so an
+        interrupted write never leaves a truncated tree behind.
+        
+        Args:
+            data: The dictionary returned by AkinatorNode.to_dict()
+        
+        Raises:
+            OSError: If the file could not be written
+        """
+        # Create the data directory if it doesn't exist
+        directory = os.path.dirname(self.data_file) or "."
+        os.makedirs(directory, exist_ok=True)
+        
+        with metrics.TREE_OPERATION_LATENCY.time(operation="save"):
+            encoded = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".knowledge_tree.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(encoded)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # mkstemp creates the file as 0600; keep the permissions of the file it replaces
+                try:
+                    mode = stat.S_IMODE(os.stat(self.data_file).st_mode)
+                except FileNotFoundError:
+                    mode = 0o666 & ~_UMASK
+                os.chmod(temp_path, mode)
+                os.replace(temp_path, self.data_file)
+            except BaseException:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+                raise
+        metrics.SAVE_BYTES.observe(len(encoded))
+    
+    def get_tree_stats(self) -> Dict[str, int]:
+        """
+        Get the size of the decision tree.
+        
+        Returns:
+            A dictionary with the number of nodes, leaves and the depth of the tree
+        """
+        stats = {"nodes": 0, "leaves": 0, "depth": 0}
+        
+        def traverse(node, depth):
+            if not node:
+                return
+            stats["nodes"] += 1
+            stats["depth"] = max(stats["depth"], depth)
+            if not node.is_question:
+                stats["leaves"] += 1
+            traverse(node.yes_node, depth + 1)
+            traverse(node.no_node, depth + 1)
+        
+        traverse(self.root_node, 1)
+        return stats
+    
+    def update_tree_metrics(self):
+        """Recount the whole tree and update the tree size and depth gauges."""
+        self.tree_stats = self.get_tree_stats()
+        self._set_tree_gauges()
+    
+    def _grow_tree_metrics(self, nodes: int, leaves: int, depth: int):
+        """
+        Update the tree gauges after nodes were added, without walking the tree.
+        
+        Args:
+            nodes: Number of nodes added
+            leaves: Number of leaves added
+            depth: Depth of the deepest added node
+        """
+        self.tree_stats["nodes"] += nodes
+        self.tree_stats["leaves"] += leaves
+        self.tree_stats["depth"] = max(self.tree_stats["depth"], depth)
+        self._set_tree_gauges()
+    
+    def _set_tree_gauges(self):
+        """Publish the cached tree size to the gauges."""
+        metrics.TREE_NODES.set(self.tree_stats["nodes"])
+        metrics.TREE_LEAVES.set(self.tree_stats["leaves"])
+        metrics.TREE_DEPTH.set(self.tree_stats["depth"])
+    
     def start_game(self):
         """Start a new game."""
+        self._reset_game()
+        metrics.GAMES_STARTED.inc()
+    
+    def _reset_game(self):
+        """Go back to the root without counting a new game."""
         self.current_node = self.root_node
+        self.path = []
     
     def get_current_question(self) -> str:
         """Get the current question or guess."""
         if not self.current_node:
-            self.start_game()
+            self._reset_game()
         
         return self.current_node.content
     
     def is_question(self) -> bool:
         """Check if the current node is a question or a guess."""
         if not self.current_node:
-            self.start_game()
+            self._reset_game()
         
         return self.current_node.is_question
     
@@ -195,19 +330,23 @@ class Akinator:
             bool: True if the game should continue, False if we reached a leaf node
         """
         if not self.current_node:
-            self.start_game()
+            self._reset_game()
             return True
         
         # Navigate to the next node based on the answer
+        self.path.append((self.current_node, is_yes))
         if is_yes:
             self.current_node = self.current_node.yes_node
         else:
             self.current_node = self.current_node.no_node
         
         # If we've reached a None node or a guess node, return False to end the game
+        if self.current_node is not None and not self.current_node.is_question:
+            metrics.GAMES_GUESSED.inc()
         return self.current_node is not None and self.current_node.is_question
     
-    def learn(self, correct_answer: str, distinguishing_question: str, answer_for_correct: bool):
+    def learn(self, correct_answer: str, distinguishing_question: str, answer_for_correct: bool,
+              save: bool = True) -> bool:
         """
         Learn from a wrong guess by adding a new node to the tree.
         
@@ -215,29 +354,45 @@ class Akinator:
             correct_answer: The correct answer (what the user was thinking of)
             distinguishing_question: A question that distinguishes between the guess and the correct answer
             answer_for_correct: Whether the answer to the distinguishing question is yes for the correct answer
-        """
-        if not self.current_node:
-            return
-        
-        last_guess = self.current_node.content
-        
-        # Update the current node to be a question
-        self.current_node.content = distinguishing_question
-        self.current_node.is_question = True
-        
-        # Create new leaf nodes
-        correct_node = AkinatorNode(correct_answer, False)
-        wrong_node = AkinatorNode(last_guess, False)
-        
-        if answer_for_correct:
-            self.current_node.yes_node = correct_node
-            self.current_node.no_node = wrong_node
-        else:
-            self.current_node.yes_node = wrong_node
-            self.current_node.no_node = correct_node
+            save: Whether to save the tree immediately; pass False to persist it yourself
         
-        # Save the updated tree
-        self.save_tree()
+        Returns:
+            bool: True if the tree was updated, False if there was no current guess
+        """
+        with self._lock:
+            if not self.current_node or not self._rebase_path():
+                return False
+            
+            last_guess = self.current_node.content
+            
+            # Replace the current node with a new question instead of modifying it,
+            # so earlier versions of the tree stay intact
+            question_node = AkinatorNode(distinguishing_question)
+            
+            # Create new leaf nodes
+            correct_node = AkinatorNode(correct_answer, False)
+            wrong_node = AkinatorNode(last_guess, False)
+            
+            if answer_for_correct:
+                question_node.yes_node = correct_node
+                question_node.no_node = wrong_node
+            else:
+                question_node.yes_node = wrong_node
+                question_node.no_node = correct_node
+            
+            self.root_node = self._replace_node(self.path, question_node)
+            self.current_node = question_node
+            
+            # Two nodes were added below the node at depth len(path) + 1
+            self._grow_tree_metrics(2, 1, len(self.path) + 2)
+            self.history.commit(self.root_node, f"学習: {correct_answer}", self.tree_stats)
+            metrics.GAMES_LEARNED.inc()
+            
+            # Save the updated tree
+            if save:
+                self.save_tree()
+            
+            return True
 
     def add_character(self, character_name: str, character_attributes: Dict[str, bool]):
         """
@@ -246,87 +401,220 @@ class Akinator:
         Args:
             character_name: The name of the character
             character_attributes: A dictionary of attribute questions and yes/no answers
-        """
-        # Create a new leaf node for the character
-        character_node = AkinatorNode(character_name, False)
         
-        # If there's no root node yet, create one with the first attribute
-        if not self.root_node:
-            if character_attributes:
-                first_attr, first_value = next(iter(character_attributes.items()))
-                self.root_node = AkinatorNode(first_attr)
-                
-                if first_value:  # If the answer is yes
-                    self.root_node.yes_node = character_node
+        Returns:
+            bool: True if the tree was updated, False if there was nowhere to add the character
+        """
+        with self._lock:
+            # Create a new leaf node for the character
+            character_node = AkinatorNode(character_name, False)
+            
+            # If there's no root node yet, create one with the first attribute
+            if not self.root_node:
+                if character_attributes:
+                    first_attr, first_value = next(iter(character_attributes.items()))
+                    self.root_node = AkinatorNode(first_attr)
+                    
+                    if first_value:  # If the answer is yes
+                        self.root_node.yes_node = character_node
+                    else:
+                        self.root_node.no_node = character_node
+                    
+                    # Remove the used attribute
+                    del character_attributes[first_attr]
                 else:
-                    self.root_node.no_node = character_node
+                    # If no attributes, just set the character as root
+                    self.root_node = character_node
                 
-                # Remove the used attribute
-                del character_attributes[first_attr]
+                self.update_tree_metrics()
+                changed = True
             else:
-                # If no attributes, just set the character as root
-                self.root_node = character_node
-        else:
-            # Start from the root
-            current = self.root_node
-            
-            # Navigate to a leaf node based on the attributes
-            while current.is_question:
-                question = current.content
+                # Start from the root; nodes are copied along the path instead of modified
+                current = self.root_node
+                path = []
+                replacement = None
                 
-                # If we have an answer for this question
-                if question in character_attributes:
-                    is_yes = character_attributes[question]
+                # Navigate to a leaf node based on the attributes
+                while current.is_question:
+                    question = current.content
                     
-                    if is_yes:
+                    # If we have an answer for this question
+                    if question in character_attributes:
+                        is_yes = character_attributes[question]
+                        
+                        if is_yes:
+                            if current.yes_node is None:
+                                replacement = current.copy()
+                                replacement.yes_node = character_node
+                                added_nodes = 1
+                                break
+                        else:
+                            if current.no_node is None:
+                                replacement = current.copy()
+                                replacement.no_node = character_node
+                                added_nodes = 1
+                                break
+                    else:
+                        # If we don't have an answer, choose a path randomly or stop here
                         if current.yes_node is None:
-                            current.yes_node = character_node
+                            replacement = current.copy()
+                            replacement.yes_node = character_node
+                            added_nodes = 1
                             break
-                        current = current.yes_node
-                    else:
-                        if current.no_node is None:
-                            current.no_node = character_node
+                        elif current.no_node is None:
+                            replacement = current.copy()
+                            replacement.no_node = character_node
+                            added_nodes = 1
                             break
-                        current = current.no_node
-                else:
-                    # If we don't have an answer, choose a path randomly or stop here
-                    if current.yes_node is None:
-                        current.yes_node = character_node
-                        break
-                    elif current.no_node is None:
-                        current.no_node = character_node
-                        break
-                    else:
-                        # Just choose randomly
-                        if random.choice([True, False]):
-                            current = current.yes_node
                         else:
-                            current = current.no_node
-            
-            # If we reached a leaf, we need to add a new question to distinguish
-            if not current.is_question:
-                # Find an unused attribute to distinguish
-                for question, answer in character_attributes.items():
-                    # Use this attribute to create a new question node
-                    old_content = current.content
-                    current.content = question
-                    current.is_question = True
-                    
-                    old_node = AkinatorNode(old_content, False)
-                    new_node = AkinatorNode(character_name, False)
-                    
-                    if answer:  # If the answer is yes for the new character
-                        current.yes_node = new_node
-                        current.no_node = old_node
-                    else:
-                        current.yes_node = old_node
-                        current.no_node = new_node
+                            # Just choose randomly
+                            is_yes = random.choice([True, False])
                     
-                    break
-        
-        # Save the tree
-        self.save_tree()
+                    path.append((current, is_yes))
+                    current = current.yes_node if is_yes else current.no_node
+                
+                # If we reached a leaf, we need to add a new question to distinguish
+                if not current.is_question:
+                    # Find an unused attribute to distinguish
+                    for question, answer in character_attributes.items():
+                        # Use this attribute to create a new question node
+                        replacement = AkinatorNode(question)
+                        added_nodes = 2
+                        
+                        old_node = AkinatorNode(current.content, False)
+                        new_node = AkinatorNode(character_name, False)
+                        
+                        if answer:  # If the answer is yes for the new character
+                            replacement.yes_node = new_node
+                            replacement.no_node = old_node
+                        else:
+                            replacement.yes_node = old_node
+                            replacement.no_node = new_node
+                        
+                        break
+                
+                changed = replacement is not None
+                if changed:
+                    self.root_node = self._replace_node(path, replacement)
+                    self._grow_tree_metrics(added_nodes, 1, len(path) + 2)
+            
+            if not changed:
+                return False
+            
+            self.history.commit(self.root_node, f"キャラクター追加: {character_name}", self.tree_stats)
+            
+            metrics.CHARACTERS_ADDED.inc()
+            
+            # Save the tree
+            self.save_tree()
+            
+            return True
 
+    def _replace_node(self, path: List[Tuple[AkinatorNode, bool]], new_node: AkinatorNode) -> AkinatorNode:
+        """
+        Build a new tree in which the node reached by the path is replaced.
+        
+        Only the nodes on the path are copied; all other subtrees are shared with
+        the current tree, so this takes O(path length).
+        
+        Args:
+            path: The (node, answer) pairs leading from the root to the replaced node
+            new_node: The node to put in place of the replaced node
+        
+        Returns:
+            The root node of the new tree
+        """
+        node = new_node
+        for parent, is_yes in reversed(path):
+            parent = parent.copy()
+            if is_yes:
+                parent.yes_node = node
+            else:
+                parent.no_node = node
+            node = parent
+        return node
+    
+    def _rebase_path(self) -> bool:
+        """
+        Make sure the current game's path starts at the current root.
+        
+        If the tree changed while the game was in progress, the answers are
+        replayed against the new tree so later changes are not lost.
+        
+        Returns:
+            bool: True if the path leads to the same guess in the current tree
+        """
+        start = self.path[0][0] if self.path else self.current_node
+        if start is self.root_node:
+            return True
+        
+        node = self.root_node
+        path = []
+        for _, is_yes in self.path:
+            if node is None or not node.is_question:
+                return False
+            path.append((node, is_yes))
+            node = node.yes_node if is_yes else node.no_node
+        
+        if (node is None or node.is_question != self.current_node.is_question
+                or node.content != self.current_node.content):
+            return False
+        
+        self.path = path
+        self.current_node = node
+        return True
+    
+    def list_versions(self) -> List[Dict]:
+        """Get the metadata of all kept versions of the tree, oldest first."""
+        return self.history.list_versions()
+    
+    def diff_versions(self, old_id: int, new_id: int) -> List[Dict]:
+        """
+        Compare two versions of the tree.
+        
+        Raises:
+            KeyError: If either version does not exist
+        """
+        return self.history.diff(old_id, new_id)
+    
+    def rollback(self, version_id: int, save: bool = True) -> TreeVersion:
+        """
+        Restore an earlier version of the tree.
+        
+        The rollback is recorded as a new version, so it can be undone as well.
+        Any game in progress is restarted.
+        
+        Args:
+            version_id: The id of the version to restore
+            save: Whether to save the restored tree immediately
+        
+        Returns:
+            The version recorded for the rollback
+        
+        Raises:
+            KeyError: If the version does not exist
+        """
+        with self._lock:
+            version = self.history.get(version_id)
+            self.root_node = version.root_node
+            self.current_node = None
+            self.path = []
+            
+            # Restore the size recorded with the version instead of walking the tree
+            if version.tree_stats is not None:
+                self.tree_stats = dict(version.tree_stats)
+                self._set_tree_gauges()
+            else:
+                self.update_tree_metrics()
+            
+            rollback_version = self.history.commit(self.root_node, f"ロールバック: v{version_id}",
+                                                   self.tree_stats)
+            
+            if save:
+                self.save_tree()
+            
+            return rollback_version
+    
     def get_all_questions(self) -> List[str]:
         """Get all unique questions in the tree."""
         questions = set()
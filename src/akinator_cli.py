@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Headless command line version of the Akinator game.
+
+Besides interactive play, answer sequences can be replayed from a JSONL
+stream to regression-test the knowledge tree and measure its accuracy.
+Each input line looks like::
+
+    {"answers": ["yes", "no", "yes"], "expected": "犬"}
+
+and produces one JSON result line on the output stream.
+"""
+
+import json
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, TextIO
+
+try:
+    from .akinator import DEFAULT_DATA_FILE, Akinator, AkinatorNode
+except ImportError:
+    from akinator import DEFAULT_DATA_FILE, Akinator, AkinatorNode
+
+
+YES_ANSWERS = {"y", "yes", "はい", "true", "1"}
+NO_ANSWERS = {"n", "no", "いいえ", "false", "0"}
+
+
+def parse_answer(value) -> Optional[bool]:
+    """
+    Convert a yes/no answer to a boolean.
+
+    Args:
+        value: A boolean or a string such as "yes", "n" or "はい"
+
+    Returns:
+        True for yes, False for no, None if the answer is not recognized
+    """
+    if isinstance(value, bool):
+        return value
+
+    text = str(value).strip().lower()
+    if text in YES_ANSWERS:
+        return True
+    if text in NO_ANSWERS:
+        return False
+    return None
+
+
+def ask_yes_no(prompt: str, input_func=input) -> bool:
+    """Ask a yes/no question until a valid answer is given."""
+    while True:
+        answer = parse_answer(input_func(f"{prompt} (y/n): "))
+        if answer is not None:
+            return answer
+        print("「y」か「n」で答えてください。")
+
+
+def play_game(data_file: str = None, input_func=input):
+    """
+    Play the game interactively on the terminal.
+
+    Args:
+        data_file: Path to the knowledge tree JSON file
+        input_func: Function used to read a line of input
+    """
+    akinator = Akinator(data_file)
+
+    print("何か（物、動物、人物など）を思い浮かべてください。")
+
+    try:
+        while True:
+            akinator.start_game()
+
+            while akinator.is_question():
+                if not akinator.answer(ask_yes_no(akinator.get_current_question(), input_func)):
+                    break
+
+            if akinator.current_node is None:
+                # The answers led to a missing branch; there is no guess to learn from
+                print("うーん、わかりませんでした。")
+            elif ask_yes_no(f"あなたが思い浮かべているのは「{akinator.get_current_question()}」ですか？",
+                            input_func):
+                print("やった！正解することができました！")
+            else:
+                correct_answer = input_func("あなたが考えていたものは何ですか？: ").strip()
+                distinguishing_question = input_func(
+                    f"「{correct_answer}」と「{akinator.get_current_question()}」を区別する質問を入力してください: "
+                ).strip()
+
+                if correct_answer and distinguishing_question:
+                    answer_for_correct = ask_yes_no(
+                        f"「{correct_answer}」の場合、「{distinguishing_question}」の答えは？", input_func
+                    )
+                    akinator.learn(correct_answer, distinguishing_question, answer_for_correct)
+                    print("新しい知識を学びました！ありがとうございます。")
+
+            if not ask_yes_no("もう一度遊びますか？", input_func):
+                break
+    except (EOFError, KeyboardInterrupt):
+        # Input was closed or interrupted; end the game quietly
+        print()
+
+
+def replay_game(akinator: Akinator, answers: List) -> Dict:
+    """
+    Replay one answer sequence against the tree without modifying it.
+
+    Args:
+        akinator: The Akinator instance to play against
+        answers: The answers to the questions, in order
+
+    Returns:
+        A dictionary with the final guess and the number of answers used
+
+    Raises:
+        ValueError: If answers is not a list or an answer is not a recognized yes/no value
+    """
+    if not isinstance(answers, list):
+        raise ValueError(f'"answers" must be a list, got {type(answers).__name__}')
+
+    akinator.start_game()
+    used = 0
+
+    while akinator.is_question() and used < len(answers):
+        is_yes = parse_answer(answers[used])
+        if is_yes is None:
+            raise ValueError(f"Invalid answer: {answers[used]!r}")
+        used += 1
+        if not akinator.answer(is_yes):
+            break
+
+    if akinator.current_node is None:
+        return {"guess": None, "answers_used": used, "status": "no_guess"}
+    if akinator.is_question():
+        return {"guess": None, "answers_used": used, "status": "incomplete",
+                "question": akinator.get_current_question()}
+    return {"guess": akinator.get_current_question(), "answers_used": used, "status": "guessed"}
+
+
+def load_tree_readonly(data_file: str = None) -> Akinator:
+    """
+    Load the knowledge tree for replaying without ever writing to it.
+
+    Unlike Akinator(data_file), a missing or invalid file is an error instead
+    of being replaced by the default tree.
+
+    Args:
+        data_file: Path to the knowledge tree JSON file
+
+    Returns:
+        An Akinator instance playing against the loaded tree
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the file is not valid JSON
+        KeyError, TypeError: If the JSON is not a knowledge tree
+    """
+    data_file = data_file or DEFAULT_DATA_FILE
+    with open(data_file, "r", encoding="utf-8") as f:
+        root_node = AkinatorNode.from_dict(json.load(f))
+    return Akinator(data_file, root_node=root_node)
+
+
+def replay(lines: Iterable[str], output: TextIO, akinator: Akinator) -> Dict:
+    """
+    Replay a JSONL stream of answer sequences and write one result per game.
+
+    Args:
+        lines: Lines of JSON objects with "answers" and optionally "expected"
+        output: Stream the JSON result lines are written to
+        akinator: The Akinator instance to play against, see load_tree_readonly()
+
+    Returns:
+        A summary with the number of games, correct guesses, errors and throughput
+    """
+    summary = {"games": 0, "checked": 0, "correct": 0, "errors": 0}
+    start = time.perf_counter()
+
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+
+        summary["games"] += 1
+        result = {"line": line_number}
+
+        try:
+            game = json.loads(line)
+            result.update(replay_game(akinator, game["answers"]))
+            if "expected" in game:
+                result["expected"] = game["expected"]
+                result["correct"] = result["guess"] == game["expected"]
+                summary["checked"] += 1
+                summary["correct"] += result["correct"]
+        except (ValueError, KeyError, TypeError) as e:
+            summary["errors"] += 1
+            result.update({"status": "error", "error": str(e)})
+
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    elapsed = time.perf_counter() - start
+    summary["accuracy"] = summary["correct"] / summary["checked"] if summary["checked"] else None
+    summary["seconds"] = elapsed
+    summary["games_per_second"] = summary["games"] / elapsed if elapsed > 0 else None
+    return summary
+
+
+def run_replay(source: str, data_file: str = None) -> int:
+    """
+    Replay answer sequences from a file ("-" for stdin) and print a summary to stderr.
+
+    Returns:
+        The process exit code: 0 if every checked game was guessed correctly,
+        1 if some were not, 2 if the tree or the input could not be read
+    """
+    try:
+        akinator = load_tree_readonly(data_file)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Error loading knowledge tree {data_file or DEFAULT_DATA_FILE}: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        if source == "-":
+            summary = replay(sys.stdin, sys.stdout, akinator)
+        else:
+            with open(source, "r", encoding="utf-8") as f:
+                summary = replay(f, sys.stdout, akinator)
+    except (OSError, ValueError) as e:
+        # ValueError covers UnicodeDecodeError from a badly encoded input file
+        print(f"Error reading {source}: {e}", file=sys.stderr)
+        return 2
+
+    print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
+    return 0 if summary["errors"] == 0 and summary["correct"] == summary["checked"] else 1
+
+
+if __name__ == "__main__":
+    play_game()
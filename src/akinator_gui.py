@@ -8,10 +8,73 @@ GUI version of the Akinator game using Tkinter.
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 import os
+import queue
 import sys
+import threading
 from akinator import Akinator
 
 
+class TreeWriter:
+    """
+    Background thread that writes the knowledge tree to disk.
+    
+    Saves requested while a write is in progress are coalesced so only the
+    latest tree is written, and a single thread guarantees that two writes
+    to the same file never overlap. Tree nodes are never modified once they
+    are part of a version, so the root can be serialized on this thread while
+    the GUI keeps playing.
+    """
+    
+    def __init__(self, akinator: Akinator):
+        """
+        Initialize the writer and start its thread.
+        
+        Args:
+            akinator: The Akinator instance whose data file is written
+        """
+        self.akinator = akinator
+        self.results = queue.Queue()
+        self._pending = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="akinator-tree-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, root_node):
+        """
+        Schedule the tree to be written, replacing any unwritten one.
+        
+        Args:
+            root_node: The root node of the tree to write
+        """
+        with self._condition:
+            self._pending = root_node
+            self._condition.notify()
+    
+    def close(self):
+        """Write any pending snapshot and stop the thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+    
+    def _run(self):
+        """Writer loop; results (None or the raised exception) are put on the results queue."""
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                root_node, self._pending = self._pending, None
+            
+            try:
+                self.akinator.write_tree_data(root_node.to_dict())
+                self.results.put(None)
+            except Exception as e:
+                self.results.put(e)
+
+
 class AkinatorGUI:
     """GUI implementation of the Akinator game."""
     
@@ -28,9 +91,16 @@ class AkinatorGUI:
         # Create the Akinator instance
         self.akinator = Akinator()
         
+        # Save the tree in the background so the window does not freeze
+        self.writer = TreeWriter(self.akinator)
+        self.root.protocol("WM_DELETE_WINDOW", self.quit)
+        
         # Create GUI elements
         self.create_widgets()
         
+        # Poll the writer for results on the Tk main thread
+        self.root.after(100, self.check_save_results)
+        
         # Start a new game
         self.start_new_game()
     
@@ -93,6 +163,16 @@ class AkinatorGUI:
             command=self.start_new_game
         )
         self.restart_button.pack(pady=10)
+        
+        # Status label for background saves
+        self.status_label = tk.Label(
+            self.root,
+            text="",
+            font=("Arial", 10),
+            fg="#808080",
+            bg="#f0f0f0"
+        )
+        self.status_label.pack(side=tk.BOTTOM, pady=5)
     
     def start_new_game(self):
         """Start a new game."""
@@ -141,28 +221,9 @@ class AkinatorGUI:
                     f"For {correct_answer}, is the answer to '{distinguishing_question}' yes?"
                 )
                 
-                # Create new nodes (simplified version)
-                last_guess = self.akinator.get_current_question()
-                
-                # Store the last node content
-                if self.akinator.current_node:
-                    self.akinator.current_node.content = distinguishing_question
-                    self.akinator.current_node.is_question = True
-                    
-                    # Create new leaf nodes
-                    from akinator import AkinatorNode
-                    correct_node = AkinatorNode(correct_answer, False)
-                    wrong_node = AkinatorNode(last_guess, False)
-                    
-                    if answer_for_correct:
-                        self.akinator.current_node.yes_node = correct_node
-                        self.akinator.current_node.no_node = wrong_node
-                    else:
-                        self.akinator.current_node.yes_node = wrong_node
-                        self.akinator.current_node.no_node = correct_node
-                
-                # Save the updated tree
-                self.akinator.save_tree()
+                if self.akinator.learn(correct_answer, distinguishing_question, answer_for_correct,
+                                       save=False):
+                    self.save_tree()
                 
                 messagebox.showinfo("Thank you", "Thanks for teaching me something new!")
         
@@ -175,7 +236,36 @@ class AkinatorGUI:
         if play_again:
             self.start_new_game()
         else:
-            self.root.destroy()
+            self.quit()
+    
+    def save_tree(self):
+        """Hand the current tree to the background writer."""
+        self.writer.submit(self.akinator.root_node)
+        self.status_label.configure(text="Saving...")
+    
+    def check_save_results(self):
+        """Report the results of background saves (runs on the Tk main thread)."""
+        self.report_save_results()
+        self.root.after(100, self.check_save_results)
+    
+    def report_save_results(self):
+        """Show the results of finished background saves."""
+        try:
+            while True:
+                error = self.writer.results.get_nowait()
+                if error is None:
+                    self.status_label.configure(text="Saved")
+                else:
+                    self.status_label.configure(text="Save failed")
+                    messagebox.showerror("Error", f"Error saving knowledge tree: {error}")
+        except queue.Empty:
+            pass
+    
+    def quit(self):
+        """Wait for pending saves, report their results and close the window."""
+        self.writer.close()
+        self.report_save_results()
+        self.root.destroy()
 
 
 def main():
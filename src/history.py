@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Version history of the Akinator knowledge tree.
+
+Every change to the tree produces a new root that shares all unchanged nodes
+with the previous version (path copying), so keeping a version costs only the
+nodes on the changed path. Nodes that belong to a recorded version must never
+be modified in place.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+
+class TreeVersion:
+    """A single recorded version of the knowledge tree."""
+
+    def __init__(self, version_id: int, root_node, description: str, parent_id: Optional[int] = None,
+                 tree_stats: Optional[Dict[str, int]] = None):
+        """
+        Initialize a version.
+
+        Args:
+            version_id: Unique, increasing id of the version
+            root_node: The root node of the tree in this version
+            description: A short description of the change
+            parent_id: The id of the version this one was derived from
+            tree_stats: The size of the tree in this version, restored on rollback
+        """
+        self.version_id = version_id
+        self.root_node = root_node
+        self.description = description
+        self.parent_id = parent_id
+        self.tree_stats = dict(tree_stats) if tree_stats is not None else None
+        self.created_at = time.time()
+
+    def to_dict(self) -> Dict:
+        """Convert the version metadata to a dictionary."""
+        return {
+            "id": self.version_id,
+            "description": self.description,
+            "parent_id": self.parent_id,
+            "created_at": self.created_at,
+        }
+
+
+class TreeHistory:
+    """A bounded history of knowledge tree versions."""
+
+    def __init__(self, max_versions: int = 100):
+        """
+        Initialize the history.
+
+        Args:
+            max_versions: Maximum number of versions kept; the oldest ones are dropped first
+        """
+        if max_versions < 1:
+            raise ValueError("max_versions must be at least 1")
+        self.max_versions = max_versions
+        self._versions = deque()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def commit(self, root_node, description: str,
+               tree_stats: Optional[Dict[str, int]] = None) -> TreeVersion:
+        """
+        Record a new version.
+
+        Args:
+            root_node: The root node of the new tree
+            description: A short description of the change
+            tree_stats: The size of the new tree (nodes, leaves, depth), if known
+
+        Returns:
+            The recorded version
+        """
+        with self._lock:
+            parent_id = self._versions[-1].version_id if self._versions else None
+            version = TreeVersion(self._next_id, root_node, description, parent_id, tree_stats)
+            self._next_id += 1
+
+            self._versions.append(version)
+            while len(self._versions) > self.max_versions:
+                self._versions.popleft()
+
+        return version
+
+    @property
+    def current(self) -> Optional[TreeVersion]:
+        """The most recent version."""
+        return self._versions[-1] if self._versions else None
+
+    def get(self, version_id: int) -> TreeVersion:
+        """
+        Get a version by id.
+
+        Raises:
+            KeyError: If the version does not exist or has been dropped
+        """
+        with self._lock:
+            for version in self._versions:
+                if version.version_id == version_id:
+                    return version
+        raise KeyError(f"Unknown version: {version_id}")
+
+    def list_versions(self) -> List[Dict]:
+        """Get the metadata of all kept versions, oldest first."""
+        with self._lock:
+            return [version.to_dict() for version in self._versions]
+
+    def diff(self, old_id: int, new_id: int) -> List[Dict]:
+        """
+        Compare two versions.
+
+        Subtrees shared between the versions are skipped, so the cost is
+        proportional to the changed paths rather than the size of the tree.
+
+        Args:
+            old_id: The id of the older version
+            new_id: The id of the newer version
+
+        Returns:
+            A list of changes, each with the path of answers ("yes"/"no") from the
+            root and the old and new node (None if the node does not exist)
+        """
+        changes = []
+        diff_nodes(self.get(old_id).root_node, self.get(new_id).root_node, [], changes)
+        return changes
+
+
+def _node_summary(node) -> Optional[Dict]:
+    """Describe a single node without its children."""
+    if node is None:
+        return None
+    return {"content": node.content, "is_question": node.is_question}
+
+
+def diff_nodes(old_node, new_node, path: List[str], changes: List[Dict]):
+    """
+    Collect the differences between two subtrees.
+
+    Args:
+        old_node: The root of the old subtree
+        new_node: The root of the new subtree
+        path: The answers leading from the tree root to these nodes
+        changes: The list the changes are appended to
+    """
+    if old_node is new_node:
+        return
+
+    old_summary = _node_summary(old_node)
+    new_summary = _node_summary(new_node)
+    if old_summary != new_summary:
+        changes.append({"path": list(path), "old": old_summary, "new": new_summary})
+
+    if old_node is None and new_node is None:
+        return
+
+    diff_nodes(old_node and old_node.yes_node, new_node and new_node.yes_node, path + ["yes"], changes)
+    diff_nodes(old_node and old_node.no_node, new_node and new_node.no_node, path + ["no"], changes)
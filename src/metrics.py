@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Lightweight Prometheus-style metrics and an optional sampling profiler.
+
+Only the standard library is used so the game keeps running without any
+extra dependencies. Metrics are rendered in the Prometheus text exposition
+format by ``render_metrics()``.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter as _FrameCounter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Buckets for the size of a saved knowledge tree in bytes
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    """Format a label tuple as ``{name="value",...}``."""
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value, using the Prometheus spelling for infinity."""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for all metric types."""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Initialize a metric.
+
+        Args:
+            name: The metric name
+            documentation: Help text shown in the exposition output
+            labelnames: Names of the labels this metric is partitioned by
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_key(self, labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+        """Build a hashable key from a label dictionary."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        """Return the samples of this metric as (suffix, labels, value) tuples."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render the metric in the Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """A monotonically increasing counter; its name always ends with ``_total``."""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        # HELP/TYPE must use the same family name as the samples
+        if not name.endswith("_total"):
+            name += "_total"
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        """Increment the counter by the given amount."""
+        key = self._label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Get the current value of the counter."""
+        return self._values.get(self._label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        return [("", key, value) for key, value in items]
+
+
+class Gauge(_Metric):
+    """A value that can go up and down."""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def set(self, value: float, **labels):
+        """Set the gauge to the given value."""
+        key = self._label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        """Get the current value of the gauge."""
+        return self._values.get(self._label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        return [("", key, value) for key, value in items]
+
+
+class Histogram(_Metric):
+    """A histogram of observed values with cumulative buckets."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label key -> [bucket counts..., sum, count]
+        self._values = {}
+
+    def observe(self, value: float, **labels):
+        """Record a single observation."""
+        key = self._label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def time(self, **labels) -> "_Timer":
+        """Return a context manager that observes the elapsed time of its block."""
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        """Get the number of observations recorded."""
+        state = self._values.get(self._label_key(labels))
+        return state[-1] if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        result = []
+        for key, state in items:
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += state[i]
+                result.append(("_bucket", key + (("le", _format_value(bound)),), cumulative))
+            result.append(("_sum", key, state[-2]))
+            result.append(("_count", key, state[-1]))
+        return result
+
+
+class _Timer:
+    """Context manager used by ``Histogram.time()``."""
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """A collection of metrics that can be rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Register a metric, returning the already registered one on name clashes."""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def render(self) -> str:
+        """Render all registered metrics in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Create (or get) a counter in the default registry."""
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    """Create (or get) a gauge in the default registry."""
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    """Create (or get) a histogram in the default registry."""
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def render_metrics() -> str:
+    """Render the default registry in the Prometheus text format."""
+    return REGISTRY.render()
+
+
+# Metrics shared by the game engine and the web application
+REQUEST_LATENCY = histogram(
+    "akinator_request_duration_seconds",
+    "Latency of HTTP requests by endpoint.",
+    ["endpoint"],
+)
+TREE_OPERATION_LATENCY = histogram(
+    "akinator_tree_operation_duration_seconds",
+    "Latency of knowledge tree persistence operations.",
+    ["operation"],
+)
+SAVE_BYTES = histogram(
+    "akinator_tree_save_bytes",
+    "Bytes written per knowledge tree save.",
+    buckets=BYTES_BUCKETS,
+)
+GAMES_STARTED = counter("akinator_games_started_total", "Number of games started.")
+GAMES_GUESSED = counter("akinator_games_guessed_total", "Number of games that reached a guess.")
+GAMES_LEARNED = counter("akinator_games_learned_total", "Number of new items learned from wrong guesses.")
+CHARACTERS_ADDED = counter("akinator_characters_added_total", "Number of characters added manually.")
+TREE_NODES = gauge("akinator_tree_nodes", "Number of nodes in the knowledge tree.")
+TREE_LEAVES = gauge("akinator_tree_leaves", "Number of guess (leaf) nodes in the knowledge tree.")
+TREE_DEPTH = gauge("akinator_tree_depth", "Depth of the knowledge tree.")
+
+
+class SamplingProfiler:
+    """
+    A simple statistical profiler that periodically samples the stacks of all threads.
+
+    Useful during a load test to find the hottest functions without the overhead
+    of a deterministic profiler.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """
+        Initialize the profiler.
+
+        Args:
+            interval: Seconds between two samples
+        """
+        self.interval = interval
+        self.samples = 0
+        self._self_counts = _FrameCounter()
+        self._total_counts = _FrameCounter()
+        self._stop_event = threading.Event()
+        self._thread = None  # type: Optional[threading.Thread]
+
+    def start(self):
+        """Start sampling in a background daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="akinator-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        """Sampling loop."""
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self._record(frame)
+            self.samples += 1
+
+    def _record(self, frame):
+        """Record one stack sample."""
+        self._self_counts[self._frame_key(frame)] += 1
+        seen = set()
+        while frame is not None:
+            key = self._frame_key(frame)
+            if key not in seen:
+                seen.add(key)
+                self._total_counts[key] += 1
+            frame = frame.f_back
+
+    @staticmethod
+    def _frame_key(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+
+    def hottest(self, limit: int = 20) -> List[Tuple[str, int, int]]:
+        """
+        Get the hottest functions.
+
+        Args:
+            limit: Maximum number of functions to return
+
+        Returns:
+            A list of (function, self samples, cumulative samples) sorted by self samples
+        """
+        return [(key, count, self._total_counts[key])
+                for key, count in self._self_counts.most_common(limit)]
+
+    def dump(self, limit: int = 20, stream=None):
+        """Print the hottest functions to the given stream (stderr by default)."""
+        stream = stream or sys.stderr
+        print(f"Sampling profile: {self.samples} samples every {self.interval * 1000:.1f} ms",
+              file=stream)
+        print(f"{'self':>8} {'total':>8}  function", file=stream)
+        for key, self_count, total_count in self.hottest(limit):
+            print(f"{self_count:>8} {total_count:>8}  {key}", file=stream)
@@ -142,6 +142,13 @@ document.addEventListener('DOMContentLoaded', function() {
                 resultText.textContent = '新しい知識を学びました！ありがとうございます。';
                 // 嬉しい画像に変更
                 changeAkinatorImage('happy');
+            } else {
+                // ゲーム中に知識ツリーが変更された場合など
+                learnContainer.style.display = 'none';
+                resultContainer.style.display = 'block';
+                document.getElementById('result-title').textContent = '学習できませんでした';
+                resultText.textContent = data.error || 'エラーが発生しました。もう一度お試しください。';
+                changeAkinatorImage('surprised');
             }
         })
         .catch(error => {
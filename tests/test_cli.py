@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the headless replay mode.
+"""
+
+import io
+import json
+import os
+import sys
+
+import pytest
+
+# Add the repository root to the path
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from src.akinator_cli import load_tree_readonly, replay, replay_game, run_replay
+
+
+# Q1 -yes-> A, Q1 -no-> Q2 -yes-> B; Q2 has no "no" branch
+TREE = {
+    "content": "Q1",
+    "is_question": True,
+    "yes_node": {"content": "A", "is_question": False},
+    "no_node": {
+        "content": "Q2",
+        "is_question": True,
+        "yes_node": {"content": "B", "is_question": False},
+    },
+}
+
+
+@pytest.fixture
+def tree_file(tmp_path):
+    path = tmp_path / "knowledge_tree.json"
+    path.write_text(json.dumps(TREE), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def akinator(tree_file):
+    return load_tree_readonly(tree_file)
+
+
+def test_replay_game_statuses(akinator):
+    assert replay_game(akinator, ["yes"]) == {"guess": "A", "answers_used": 1, "status": "guessed"}
+    assert replay_game(akinator, [False, "はい"]) == {"guess": "B", "answers_used": 2, "status": "guessed"}
+    assert replay_game(akinator, ["no"]) == {"guess": None, "answers_used": 1, "status": "incomplete",
+                                             "question": "Q2"}
+    assert replay_game(akinator, ["n", "n"]) == {"guess": None, "answers_used": 2, "status": "no_guess"}
+
+
+def test_replay_game_rejects_bad_answers(akinator):
+    with pytest.raises(ValueError, match="Invalid answer: 'maybe'"):
+        replay_game(akinator, ["maybe"])
+    with pytest.raises(ValueError, match='"answers" must be a list, got str'):
+        replay_game(akinator, "yes")
+
+
+def test_replay_writes_one_result_per_game(akinator):
+    lines = [
+        '{"answers": ["yes"], "expected": "A"}\n',
+        '{"answers": ["no", "yes"], "expected": "A"}\n',
+        "\n",
+        '{"answers": "yes"}\n',
+        "not json\n",
+        '{"expected": "A"}\n',
+    ]
+    output = io.StringIO()
+
+    summary = replay(lines, output, akinator)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [result["line"] for result in results] == [1, 2, 4, 5, 6]
+    assert results[0]["correct"] is True
+    assert results[1]["correct"] is False and results[1]["guess"] == "B"
+    assert [result["status"] for result in results[2:]] == ["error", "error", "error"]
+    assert summary["games"] == 5
+    assert summary["checked"] == 2
+    assert summary["correct"] == 1
+    assert summary["errors"] == 3
+    assert summary["accuracy"] == 0.5
+
+
+def test_run_replay_exit_codes(tree_file, tmp_path, monkeypatch, capsys):
+    games = tmp_path / "games.jsonl"
+
+    games.write_text('{"answers": ["yes"], "expected": "A"}\n', encoding="utf-8")
+    assert run_replay(str(games), tree_file) == 0
+
+    games.write_text('{"answers": ["yes"], "expected": "B"}\n', encoding="utf-8")
+    assert run_replay(str(games), tree_file) == 1
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO('{"answers": ["no", "yes"], "expected": "B"}\n'))
+    assert run_replay("-", tree_file) == 0
+
+    games.write_bytes(b'{"answers": ["yes"]}\n\xff\xfe\n')
+    assert run_replay(str(games), tree_file) == 2
+    assert "Error reading" in capsys.readouterr().err
+
+    assert run_replay(str(tmp_path / "missing.jsonl"), tree_file) == 2
+
+
+def test_run_replay_never_touches_a_bad_tree(tmp_path, capsys):
+    games = tmp_path / "games.jsonl"
+    games.write_text('{"answers": ["yes"]}\n', encoding="utf-8")
+
+    broken = tmp_path / "broken.json"
+    broken.write_text('{"content": "x", ', encoding="utf-8")
+    assert run_replay(str(games), str(broken)) == 2
+    assert broken.read_text(encoding="utf-8") == '{"content": "x", '
+
+    missing = tmp_path / "typo" / "missing.json"
+    assert run_replay(str(games), str(missing)) == 2
+    assert not missing.parent.exists()
+
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "Error loading knowledge tree" in captured.err
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the versioned knowledge tree.
+"""
+
+import importlib
+import os
+import sys
+
+import pytest
+
+# Add the repository root to the path
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from src.akinator import Akinator
+from src.history import TreeHistory
+
+
+@pytest.fixture
+def akinator(tmp_path):
+    """An Akinator instance using the default tree in a temporary file."""
+    return Akinator(str(tmp_path / "knowledge_tree.json"))
+
+
+def play(akinator, answers):
+    """Start a game and answer the questions in order."""
+    akinator.start_game()
+    for is_yes in answers:
+        akinator.answer(is_yes)
+
+
+def test_learn_shares_unchanged_subtrees(akinator):
+    old_root = akinator.root_node
+    old_snapshot = old_root.to_dict()
+
+    # 生物 -> 動物 -> 四本足 -> ペット -> 犬
+    play(akinator, [True, True, True, True])
+    assert akinator.learn("狼", "野生ですか？", True)
+
+    new_root = akinator.root_node
+    assert new_root is not old_root
+    assert old_root.to_dict() == old_snapshot
+
+    # Off the changed path the nodes are the same objects
+    assert new_root.no_node is old_root.no_node
+    assert new_root.yes_node.no_node is old_root.yes_node.no_node
+    assert new_root.yes_node.yes_node.no_node is old_root.yes_node.yes_node.no_node
+    assert new_root.yes_node.yes_node.yes_node.no_node is old_root.yes_node.yes_node.yes_node.no_node
+
+    learned = new_root.yes_node.yes_node.yes_node.yes_node
+    assert learned.content == "野生ですか？"
+    assert learned.yes_node.content == "狼"
+    assert learned.no_node.content == "犬"
+
+
+def test_add_character_shares_unchanged_subtrees(akinator):
+    old_root = akinator.root_node
+    old_snapshot = old_root.to_dict()
+
+    assert akinator.add_character("テレビ", {
+        "生物ですか？": False,
+        "電子機器ですか？": True,
+        "コミュニケーションに使いますか？": False,
+        "画面がありますか？": True,
+    })
+
+    new_root = akinator.root_node
+    assert old_root.to_dict() == old_snapshot
+    assert new_root.yes_node is old_root.yes_node
+    assert new_root.no_node.no_node is old_root.no_node.no_node
+    assert new_root.no_node.yes_node.yes_node is old_root.no_node.yes_node.yes_node
+    assert akinator.history.current.description == "キャラクター追加: テレビ"
+
+
+def test_add_character_without_change_records_no_version(akinator):
+    versions = len(akinator.list_versions())
+    old_root = akinator.root_node
+
+    # Without attributes the walk ends at a leaf with no question to split it
+    assert not akinator.add_character("猫2", {})
+
+    assert akinator.root_node is old_root
+    assert len(akinator.list_versions()) == versions
+
+
+def test_diff(akinator):
+    first = akinator.history.current.version_id
+    play(akinator, [False, False, True])
+    akinator.learn("ソファ", "柔らかいですか？", True)
+    second = akinator.history.current.version_id
+
+    assert akinator.diff_versions(first, first) == []
+    assert akinator.diff_versions(first, second) == [
+        {"path": ["no", "no", "yes"],
+         "old": {"content": "椅子", "is_question": False},
+         "new": {"content": "柔らかいですか？", "is_question": True}},
+        {"path": ["no", "no", "yes", "yes"],
+         "old": None,
+         "new": {"content": "ソファ", "is_question": False}},
+        {"path": ["no", "no", "yes", "no"],
+         "old": None,
+         "new": {"content": "椅子", "is_question": False}},
+    ]
+
+
+def test_rollback_is_a_new_version(akinator, tmp_path):
+    first = akinator.history.current
+    play(akinator, [True, True, True, True])
+    akinator.learn("狼", "野生ですか？", True)
+
+    akinator.rollback(first.version_id)
+
+    current = akinator.history.current
+    assert current.version_id > first.version_id
+    assert current.description == f"ロールバック: v{first.version_id}"
+    assert akinator.root_node is first.root_node
+    assert len(akinator.list_versions()) == 3
+    assert Akinator(str(tmp_path / "knowledge_tree.json")).root_node.to_dict() == first.root_node.to_dict()
+
+    with pytest.raises(KeyError):
+        akinator.rollback(12345)
+
+
+def test_rollback_restores_stats_without_walking_the_tree(akinator, monkeypatch):
+    first = akinator.history.current
+    play(akinator, [True, True, True, True])
+    akinator.learn("狼", "野生ですか？", True)
+    assert akinator.tree_stats == {"nodes": 21, "leaves": 11, "depth": 6}
+
+    def walk():
+        raise AssertionError("rollback must not walk the tree")
+
+    monkeypatch.setattr(akinator, "get_tree_stats", walk)
+    version = akinator.rollback(first.version_id, save=False)
+
+    assert version is akinator.history.current
+    assert version.tree_stats == {"nodes": 19, "leaves": 10, "depth": 5}
+    assert akinator.tree_stats == {"nodes": 19, "leaves": 10, "depth": 5}
+
+
+def test_eviction_at_max_versions():
+    history = TreeHistory(max_versions=3)
+    for i in range(5):
+        history.commit(object(), f"v{i}")
+
+    assert [version["id"] for version in history.list_versions()] == [3, 4, 5]
+    assert history.list_versions()[0]["parent_id"] == 2
+    with pytest.raises(KeyError):
+        history.get(1)
+    with pytest.raises(ValueError):
+        TreeHistory(max_versions=0)
+
+
+def test_learn_rebases_when_root_changed_mid_game(akinator):
+    play(akinator, [False, True, True])
+    assert akinator.get_current_question() == "スマートフォン"
+
+    # Another change lands while this game is waiting for the learn form
+    akinator.add_character("テレビ", {
+        "生物ですか？": False,
+        "電子機器ですか？": True,
+        "コミュニケーションに使いますか？": False,
+        "画面がありますか？": True,
+    })
+    assert akinator.learn("タブレット", "通話できますか？", False)
+
+    electronic = akinator.root_node.no_node.yes_node
+    assert electronic.yes_node.content == "通話できますか？"
+    assert electronic.yes_node.no_node.content == "タブレット"
+    # The concurrent change is kept
+    assert electronic.no_node.is_question
+    assert electronic.no_node.no_node.content == "テレビ"
+
+
+def test_learn_fails_when_guess_no_longer_exists(akinator):
+    play(akinator, [True, True, True, True])
+    assert akinator.get_current_question() == "犬"
+
+    # Someone else already replaced the guess
+    other = Akinator(akinator.data_file)
+    play(other, [True, True, True, True])
+    other.learn("狼", "野生ですか？", True)
+    akinator.root_node = other.root_node
+    versions = len(akinator.list_versions())
+
+    assert not akinator.learn("柴犬", "日本の犬ですか？", True)
+    assert akinator.root_node is other.root_node
+    assert len(akinator.list_versions()) == versions
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """A Flask test client whose Akinator uses a temporary tree."""
+    pytest.importorskip("flask")
+    # app.py creates its Akinator relative to the working directory on import
+    monkeypatch.chdir(tmp_path)
+    app_module = importlib.import_module("app")
+    monkeypatch.setattr(app_module, "akinator", Akinator(str(tmp_path / "knowledge_tree.json")))
+    monkeypatch.setitem(app_module.app.config, "ADMIN_TOKEN", "secret")
+    app_module.app.testing = True
+    return app_module.app.test_client()
+
+
+def test_learn_endpoint_reports_lost_game(client):
+    client.get("/game")
+    # A rollback clears the game in progress
+    client.post("/admin/versions/1/rollback", headers={"X-Admin-Token": "secret"})
+
+    response = client.post("/learn", json={"correct_answer": "狼",
+                                           "distinguishing_question": "野生ですか？",
+                                           "answer_for_correct": "yes"})
+
+    assert response.status_code == 409
+    assert response.get_json()["success"] is False
+
+
+def test_version_endpoints_require_token(client):
+    assert client.get("/admin/versions").status_code == 401
+    assert client.get("/admin/versions", headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+    response = client.post("/admin/versions/1/rollback", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.get_json()["version"]["description"] == "ロールバック: v1"
+
+    response = client.post("/admin/versions/999/rollback", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 404
+    assert response.get_json()["error"] == "Unknown version: 999"
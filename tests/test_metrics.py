@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the Prometheus-style metrics.
+"""
+
+import importlib
+import os
+import sys
+
+import pytest
+
+# Add the repository root to the path
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from src import metrics
+from src.akinator import Akinator
+
+
+@pytest.fixture
+def akinator(tmp_path):
+    """An Akinator instance using the default tree in a temporary file."""
+    return Akinator(str(tmp_path / "knowledge_tree.json"))
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test histogram.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0, 3.0):
+        histogram.observe(value)
+
+    assert histogram.render().splitlines() == [
+        "# HELP test_seconds Test histogram.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{le="0.1"} 2',
+        'test_seconds_bucket{le="1"} 3',
+        'test_seconds_bucket{le="+Inf"} 5',
+        "test_seconds_sum 5.65",
+        "test_seconds_count 5",
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("test_events", "Test counter.", ["name"])
+    counter.inc(name='a"b\\c\nd')
+
+    assert 'test_events_total{name="a\\"b\\\\c\\nd"} 1' in counter.render().splitlines()
+
+
+def test_counter_family_name_matches_samples():
+    counter = metrics.Counter("test_requests", "Test counter.")
+    counter.inc()
+    counter.inc(2)
+
+    assert counter.render().splitlines() == [
+        "# HELP test_requests_total Test counter.",
+        "# TYPE test_requests_total counter",
+        "test_requests_total 3",
+    ]
+    assert metrics.Counter("test_done_total", "Test counter.").name == "test_done_total"
+
+
+def test_labels_must_match():
+    gauge = metrics.Gauge("test_size", "Test gauge.", ["kind"])
+    with pytest.raises(ValueError):
+        gauge.set(1)
+
+
+def test_tree_gauges_follow_learn_and_add_character(akinator):
+    assert metrics.TREE_NODES.value() == 19
+    assert metrics.TREE_LEAVES.value() == 10
+    assert metrics.TREE_DEPTH.value() == 5
+
+    # 生物 -> 動物 -> 四本足 -> ペット -> 犬
+    akinator.start_game()
+    for _ in range(4):
+        akinator.answer(True)
+    akinator.learn("狼", "野生ですか？", True)
+
+    assert metrics.TREE_NODES.value() == 21
+    assert metrics.TREE_LEAVES.value() == 11
+    assert metrics.TREE_DEPTH.value() == 6
+
+    akinator.add_character("テレビ", {"電子機器ですか？": True, "画面がありますか？": True})
+
+    assert akinator.tree_stats == akinator.get_tree_stats()
+    assert metrics.TREE_NODES.value() == akinator.tree_stats["nodes"]
+    assert metrics.TREE_LEAVES.value() == akinator.tree_stats["leaves"]
+
+
+def test_save_records_latency_and_bytes(akinator):
+    saves = metrics.TREE_OPERATION_LATENCY.count(operation="save")
+    sizes = metrics.SAVE_BYTES.count()
+
+    akinator.save_tree()
+
+    assert metrics.TREE_OPERATION_LATENCY.count(operation="save") == saves + 1
+    assert metrics.SAVE_BYTES.count() == sizes + 1
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """A Flask test client whose Akinator uses a temporary tree."""
+    pytest.importorskip("flask")
+    # app.py creates its Akinator relative to the working directory on import
+    monkeypatch.chdir(tmp_path)
+    app_module = importlib.import_module("app")
+    monkeypatch.setattr(app_module, "akinator", Akinator(str(tmp_path / "knowledge_tree.json")))
+    app_module.app.testing = True
+    return app_module.app.test_client()
+
+
+def test_request_latency_is_recorded(client):
+    learns = metrics.REQUEST_LATENCY.count(endpoint="learn")
+
+    client.get("/game")
+    client.post("/learn", json={"correct_answer": "狼",
+                                "distinguishing_question": "野生ですか？",
+                                "answer_for_correct": "yes"})
+
+    assert metrics.REQUEST_LATENCY.count(endpoint="learn") == learns + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'akinator_request_duration_seconds_count{endpoint="learn"}' in response.get_data(as_text=True)
+
+
+def test_failed_request_latency_is_recorded(client, monkeypatch):
+    app_module = importlib.import_module("app")
+    adds = metrics.REQUEST_LATENCY.count(endpoint="add_character")
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(app_module.akinator, "add_character", fail)
+    with pytest.raises(RuntimeError):
+        client.post("/add_character", data={"character_name": "テレビ"})
+
+    assert metrics.REQUEST_LATENCY.count(endpoint="add_character") == adds + 1
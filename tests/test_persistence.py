@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for saving the knowledge tree.
+"""
+
+import os
+import stat
+import sys
+
+import pytest
+
+# Add the repository root to the path
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from src.akinator import Akinator
+
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="POSIX file permissions")
+
+
+def file_mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_save_keeps_file_mode(tmp_path):
+    data_file = tmp_path / "knowledge_tree.json"
+    akinator = Akinator(str(data_file))
+    os.chmod(data_file, 0o640)
+
+    akinator.save_tree()
+
+    assert file_mode(data_file) == 0o640
+    assert os.listdir(tmp_path) == ["knowledge_tree.json"]
+
+
+def test_new_file_follows_umask(tmp_path):
+    umask = os.umask(0)
+    os.umask(umask)
+
+    data_file = tmp_path / "knowledge_tree.json"
+    Akinator(str(data_file))
+
+    assert file_mode(data_file) == 0o666 & ~umask